@@ -3,59 +3,38 @@
 Analyze rolling code patterns from the rolling.txt file
 """
 
-import re
 from collections import defaultdict
 import sys
 
+from rolling_io import DEVICE_NAMES, load_rolling_file
+
 def parse_rolling_data(filename):
     """Parse the rolling.txt file and extract patterns"""
     
     # Power cycle timestamps (when both modem and machine send "00")
     power_cycles = []
     
-    # Message patterns by type
+    # Message timestamps by type
     message_types = defaultdict(list)
     
     # Rolling code sequences
     rolling_codes = []
     
-    with open(filename, 'r') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Parse line format: "modem/machine timestamp - data"
-            parts = line.split(' - ', 1)
-            if len(parts) != 2:
-                continue
-                
-            prefix = parts[0]
-            data = parts[1]
-            
-            # Extract timestamp
-            timestamp_match = re.search(r'(\d+)', prefix)
-            if not timestamp_match:
-                continue
+    for timestamp, device, data, packet in load_rolling_file(filename):
+        # Check for power cycle (both devices send "00")
+        if data == "00":
+            power_cycles.append((timestamp, device))
+        
+        # Extract message type from the decoded packet
+        if packet[:2] == b'\xff\xff':
+            if len(packet) >= 4:
+                msg_type = packet[2:4].hex(' ')  # e.g., "25 40"
+                message_types[msg_type].append(timestamp)
                 
-            timestamp = int(timestamp_match.group(1))
-            device = prefix.split()[0]  # modem or machine
-            
-            # Check for power cycle (both devices send "00")
-            if data == "00":
-                power_cycles.append((timestamp, device))
-            
-            # Extract message type from hex data
-            if data.startswith("ff ff"):
-                hex_parts = data.split()
-                if len(hex_parts) >= 3:
-                    msg_type = f"{hex_parts[2]} {hex_parts[3]}"  # e.g., "25 40"
-                    message_types[msg_type].append((timestamp, device, data))
-                    
-                    # Look for rolling code patterns in specific message types
-                    if msg_type in ["25 40", "43 40"]:
-                        rolling_codes.append((timestamp, device, data))
-    
+                # Look for rolling code patterns in specific message types
+                if msg_type in ["25 40", "43 40"]:
+                    rolling_codes.append((timestamp, device, packet, msg_type))
+
     return power_cycles, message_types, rolling_codes
 
 def analyze_power_cycles(power_cycles):
@@ -84,64 +63,68 @@ def analyze_power_cycles(power_cycles):
     if len(current_cycle) >= 2:
         cycles.append(current_cycle)
     
-    print(f"Found {len(cycles)} power cycles:")
+    # Buffer output and write it in one call at the end
+    lines = []
+    out = lines.append
+    
+    out(f"Found {len(cycles)} power cycles:")
+    # Cycles are built in file (timestamp) order, so the ends are the bounds
     for i, cycle in enumerate(cycles):
-        start_time = min(ts for ts, _ in cycle)
-        end_time = max(ts for ts, _ in cycle)
+        start_time = cycle[0][0]
+        end_time = cycle[-1][0]
         duration = end_time - start_time
-        print(f"  Cycle {i+1}: {start_time} - {end_time} (duration: {duration}s)")
+        out(f"  Cycle {i+1}: {start_time} - {end_time} (duration: {duration}s)")
     
     # Calculate intervals between cycles
     if len(cycles) > 1:
-        print("\nIntervals between cycles:")
+        out("\nIntervals between cycles:")
         for i in range(1, len(cycles)):
-            prev_end = max(ts for ts, _ in cycles[i-1])
-            curr_start = min(ts for ts, _ in cycles[i])
+            prev_end = cycles[i-1][-1][0]
+            curr_start = cycles[i][0][0]
             interval = curr_start - prev_end
-            print(f"  Cycle {i} to {i+1}: {interval}s")
+            out(f"  Cycle {i} to {i+1}: {interval}s")
+    
+    print("\n".join(lines))
 
 def analyze_rolling_codes(rolling_codes):
     """Analyze rolling code patterns"""
     print("\n=== ROLLING CODE ANALYSIS ===")
     
-    # Group by message type
-    type_25_40 = [rc for rc in rolling_codes if "25 40" in rc[2]]
-    type_43_40 = [rc for rc in rolling_codes if "43 40" in rc[2]]
+    # Group by the message type tagged at parse time
+    type_25_40 = [rc for rc in rolling_codes if rc[3] == "25 40"]
+    type_43_40 = [rc for rc in rolling_codes if rc[3] == "43 40"]
     
     print(f"Type 25 40 messages: {len(type_25_40)}")
     print(f"Type 43 40 messages: {len(type_43_40)}")
     
     # Extract rolling code values (look for patterns in the hex data)
     print("\nRolling code sequences (Type 25 40):")
-    for timestamp, device, data in type_25_40[:10]:  # Show first 10
-        hex_parts = data.split()
-        if len(hex_parts) >= 10:
+    for timestamp, device, packet, _ in type_25_40[:10]:  # Show first 10
+        if len(packet) >= 10:
             # Extract potential rolling code (bytes 8-11)
-            rolling_part = " ".join(hex_parts[8:12])
-            print(f"  {timestamp} {device}: {rolling_part}")
+            rolling_part = packet[8:12].hex(' ')
+            print(f"  {timestamp} {DEVICE_NAMES[device]}: {rolling_part}")
     
     print("\nRolling code sequences (Type 43 40):")
-    for timestamp, device, data in type_43_40[:10]:  # Show first 10
-        hex_parts = data.split()
-        if len(hex_parts) >= 10:
+    for timestamp, device, packet, _ in type_43_40[:10]:  # Show first 10
+        if len(packet) >= 10:
             # Extract potential rolling code (bytes 8-11)
-            rolling_part = " ".join(hex_parts[8:12])
-            print(f"  {timestamp} {device}: {rolling_part}")
+            rolling_part = packet[8:12].hex(' ')
+            print(f"  {timestamp} {DEVICE_NAMES[device]}: {rolling_part}")
 
 def analyze_message_frequency(message_types):
     """Analyze message type frequency"""
     print("\n=== MESSAGE TYPE FREQUENCY ===")
     
-    for msg_type, messages in sorted(message_types.items()):
-        print(f"Type {msg_type}: {len(messages)} messages")
+    for msg_type, timestamps in sorted(message_types.items()):
+        print(f"Type {msg_type}: {len(timestamps)} messages")
         
         # Show timing pattern for frequent message types
-        if len(messages) > 5:
-            timestamps = [ts for ts, _, _ in messages]
-            intervals = [timestamps[i] - timestamps[i-1] for i in range(1, len(timestamps))]
-            if intervals:
-                avg_interval = sum(intervals) / len(intervals)
-                print(f"  Average interval: {avg_interval:.1f}s")
+        if len(timestamps) > 5:
+            # Consecutive intervals telescope, so their mean is the overall span
+            # divided by the number of intervals
+            avg_interval = (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
+            print(f"  Average interval: {avg_interval:.1f}s")
 
 def main():
     filename = "rolling.txt"
@@ -3,91 +3,63 @@
 Cryptographic analysis of rolling codes
 """
 
-import re
 import math
 from collections import defaultdict, Counter
 import sys
 
+from rolling_io import MACHINE, MODEM, group_power_cycles, load_rolling_file
+
 def calculate_entropy(data):
     """Calculate Shannon entropy of data"""
     if not data:
         return 0
     
-    # Count byte frequencies
+    # Count byte frequencies (Counter counts in C)
     byte_counts = Counter(data)
     data_len = len(data)
     
-    # Calculate entropy
-    entropy = 0
-    for count in byte_counts.values():
-        if count > 0:
-            probability = count / data_len
-            entropy -= probability * math.log2(probability)
-    
-    return entropy
+    # H = -sum(p*log2(p)) with p = c/n, rewritten as sum(c*log2(n/c))/n so the
+    # sum runs in one generator with a single division at the end
+    log2 = math.log2
+    return sum(count * log2(data_len / count) for count in byte_counts.values()) / data_len
 
 def extract_rolling_codes(filename):
     """Extract rolling codes from file"""
     rolling_codes = []
     
-    with open(filename, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-                
-            parts = line.split(' - ', 1)
-            if len(parts) != 2:
-                continue
-                
-            prefix = parts[0]
-            data = parts[1]
-            
-            # Extract timestamp and device
-            timestamp_match = re.search(r'(\d+)', prefix)
-            if not timestamp_match:
-                continue
+    for timestamp, device, data, packet in load_rolling_file(filename):
+        # Analyze Type 25 40 (Authentication messages)
+        if data.startswith("ff ff 25 40"):
+            if len(packet) >= 15:
+                # Extract challenge and response
+                challenge_bytes = packet[8:16]  # 8 bytes challenge
+                response_bytes = packet[16:]    # Encrypted response
                 
-            timestamp = int(timestamp_match.group(1))
-            device = prefix.split()[0]
-            
-            # Analyze Type 25 40 (Authentication messages)
-            if data.startswith("ff ff 25 40"):
-                hex_parts = data.split()
-                if len(hex_parts) >= 15:
-                    # Extract challenge and response
-                    challenge = "".join(hex_parts[8:16])  # 8 bytes challenge
-                    response = "".join(hex_parts[16:])     # Encrypted response
-                    
-                    rolling_codes.append({
-                        'timestamp': timestamp,
-                        'device': device,
-                        'challenge': challenge,
-                        'response': response,
-                        'full_data': data
-                    })
-    
+                rolling_codes.append({
+                    'timestamp': timestamp,
+                    'device': device,
+                    'challenge': challenge_bytes.hex(),
+                    'response': response_bytes.hex(),
+                    'challenge_bytes': challenge_bytes,
+                    'response_bytes': response_bytes,
+                    'full_data': data
+                })
+
     return rolling_codes
 
 def analyze_challenge_patterns(rolling_codes):
     """Analyze challenge generation patterns"""
     print("=== CHALLENGE PATTERN ANALYSIS ===")
     
-    challenges = [code for code in rolling_codes if code['device'] == 'machine']
+    challenges = [code for code in rolling_codes if code['device'] == MACHINE]
     print(f"Total challenges: {len(challenges)}")
     
     if not challenges:
         print("No challenges found")
         return
     
-    # Convert hex to bytes for analysis
-    challenge_bytes = []
-    for challenge in challenges:
-        try:
-            bytes_data = bytes.fromhex(challenge['challenge'])
-            challenge_bytes.append(bytes_data)
-        except ValueError:
-            continue
+    # Challenge bytes were decoded at extraction time
+    challenge_bytes = [challenge['challenge_bytes'] for challenge in challenges]
     
     if not challenge_bytes:
         print("No valid challenge data")
@@ -130,38 +102,32 @@ def is_linear_pattern(data):
     if len(data) < 2:
         return False
     
-    # Check for arithmetic progression
-    diffs = [data[i+1] - data[i] for i in range(len(data)-1)]
-    return len(set(diffs)) == 1
+    # Check for arithmetic progression, stopping at the first mismatch
+    step = data[1] - data[0]
+    return all(b - a == step for a, b in zip(data, data[1:]))
 
 def is_xor_pattern(data):
     """Check for XOR patterns in data"""
     if len(data) < 2:
         return False
     
-    # Check for XOR with constant
-    xor_results = [data[i] ^ data[i+1] for i in range(len(data)-1)]
-    return len(set(xor_results)) == 1
+    # Check for XOR with constant, stopping at the first mismatch
+    key = data[0] ^ data[1]
+    return all(a ^ b == key for a, b in zip(data, data[1:]))
 
 def analyze_response_patterns(rolling_codes):
     """Analyze encrypted response patterns"""
     print("\n=== RESPONSE PATTERN ANALYSIS ===")
     
-    responses = [code for code in rolling_codes if code['device'] == 'modem']
+    responses = [code for code in rolling_codes if code['device'] == MODEM]
     print(f"Total responses: {len(responses)}")
     
     if not responses:
         print("No responses found")
         return
     
-    # Convert hex to bytes
-    response_bytes = []
-    for response in responses:
-        try:
-            bytes_data = bytes.fromhex(response['response'])
-            response_bytes.append(bytes_data)
-        except ValueError:
-            continue
+    # Response bytes were decoded at extraction time
+    response_bytes = [response['response_bytes'] for response in responses]
     
     if not response_bytes:
         print("No valid response data")
@@ -201,47 +167,34 @@ def analyze_rolling_code_algorithm(rolling_codes):
         return
     
     # Group by power cycles
-    power_cycles = []
-    current_cycle = []
+    power_cycles = group_power_cycles(rolling_codes, [code['timestamp'] for code in rolling_codes])
     
-    for code in rolling_codes:
-        if not current_cycle:
-            current_cycle = [code]
-        else:
-            # Check if this is a new power cycle (large time gap)
-            time_diff = code['timestamp'] - current_cycle[-1]['timestamp']
-            if time_diff > 30:  # More than 30 seconds
-                if len(current_cycle) > 1:
-                    power_cycles.append(current_cycle)
-                current_cycle = [code]
-            else:
-                current_cycle.append(code)
-    
-    if len(current_cycle) > 1:
-        power_cycles.append(current_cycle)
+    # Buffer output and write it in one call at the end
+    lines = []
+    out = lines.append
     
-    print(f"Found {len(power_cycles)} power cycles")
+    out(f"Found {len(power_cycles)} power cycles")
     
     # Analyze each power cycle
     for i, cycle in enumerate(power_cycles):
-        print(f"\nPower Cycle {i+1}:")
-        print(f"  Duration: {cycle[-1]['timestamp'] - cycle[0]['timestamp']}s")
-        print(f"  Messages: {len(cycle)}")
+        out(f"\nPower Cycle {i+1}:")
+        out(f"  Duration: {cycle[-1]['timestamp'] - cycle[0]['timestamp']}s")
+        out(f"  Messages: {len(cycle)}")
         
         # Extract challenges and responses
-        challenges = [c for c in cycle if c['device'] == 'machine']
-        responses = [c for c in cycle if c['device'] == 'modem']
+        challenges = [c for c in cycle if c['device'] == MACHINE]
+        responses = [c for c in cycle if c['device'] == MODEM]
         
-        print(f"  Challenges: {len(challenges)}")
-        print(f"  Responses: {len(responses)}")
+        out(f"  Challenges: {len(challenges)}")
+        out(f"  Responses: {len(responses)}")
         
         # Analyze challenge-response pairs
         if challenges and responses:
-            print("  Challenge-Response pairs:")
+            out("  Challenge-Response pairs:")
             for j, (challenge, response) in enumerate(zip(challenges, responses)):
-                print(f"    Pair {j+1}:")
-                print(f"      Challenge: {challenge['challenge']}")
-                print(f"      Response: {response['response'][:32]}...")
+                out(f"    Pair {j+1}:")
+                out(f"      Challenge: {challenge['challenge']}")
+                out(f"      Response: {response['response'][:32]}...")
                 
                 # Try to find patterns
                 if j > 0:
@@ -249,9 +202,11 @@ def analyze_rolling_code_algorithm(rolling_codes):
                     curr_challenge = challenge['challenge']
                     
                     if prev_challenge != curr_challenge:
-                        print(f"      Challenge changed: {prev_challenge} -> {curr_challenge}")
+                        out(f"      Challenge changed: {prev_challenge} -> {curr_challenge}")
                     else:
-                        print(f"      Challenge repeated: {curr_challenge}")
+                        out(f"      Challenge repeated: {curr_challenge}")
+    
+    print("\n".join(lines))
 
 def analyze_cryptographic_strength(rolling_codes):
     """Analyze cryptographic strength of rolling codes"""
@@ -261,41 +216,45 @@ def analyze_cryptographic_strength(rolling_codes):
         print("No rolling codes found")
         return
     
+    lines = []
+    out = lines.append
+    
     # Extract all challenges and responses
-    challenges = [code['challenge'] for code in rolling_codes if code['device'] == 'machine']
-    responses = [code['response'] for code in rolling_codes if code['device'] == 'modem']
+    challenge_codes = [code for code in rolling_codes if code['device'] == MACHINE]
+    challenges = [code['challenge'] for code in challenge_codes]
+    responses = [code['response'] for code in rolling_codes if code['device'] == MODEM]
     
-    print(f"Total challenges: {len(challenges)}")
-    print(f"Total responses: {len(responses)}")
+    out(f"Total challenges: {len(challenges)}")
+    out(f"Total responses: {len(responses)}")
     
-    # Analyze challenge uniqueness
-    unique_challenges = set(challenges)
-    print(f"Unique challenges: {len(unique_challenges)}")
+    # Analyze challenge uniqueness; the counts are reused for the repeat report below
+    challenge_counts = Counter(challenges)
+    out(f"Unique challenges: {len(challenge_counts)}")
     
-    if len(unique_challenges) < len(challenges):
-        print("WARNING: Duplicate challenges detected!")
-        duplicates = len(challenges) - len(unique_challenges)
-        print(f"Duplicate count: {duplicates}")
+    if len(challenge_counts) < len(challenges):
+        out("WARNING: Duplicate challenges detected!")
+        duplicates = len(challenges) - len(challenge_counts)
+        out(f"Duplicate count: {duplicates}")
     
     # Analyze response uniqueness
     unique_responses = set(responses)
-    print(f"Unique responses: {len(unique_responses)}")
+    out(f"Unique responses: {len(unique_responses)}")
     
     if len(unique_responses) < len(responses):
-        print("WARNING: Duplicate responses detected!")
+        out("WARNING: Duplicate responses detected!")
         duplicates = len(responses) - len(unique_responses)
-        print(f"Duplicate count: {duplicates}")
+        out(f"Duplicate count: {duplicates}")
     
     # Analyze challenge-response correlation
-    print("\nChallenge-Response correlation:")
+    out("\nChallenge-Response correlation:")
     if len(challenges) == len(responses):
         for i, (challenge, response) in enumerate(zip(challenges, responses)):
-            print(f"  Pair {i+1}: {challenge} -> {response[:16]}...")
+            out(f"  Pair {i+1}: {challenge} -> {response[:16]}...")
     else:
-        print("  Mismatched challenge-response pairs")
+        out("  Mismatched challenge-response pairs")
     
     # Analyze cryptographic properties
-    print("\nCryptographic properties:")
+    out("\nCryptographic properties:")
     
     # Check for weak patterns
     weak_patterns = []
@@ -310,28 +269,29 @@ def analyze_cryptographic_strength(rolling_codes):
         except ValueError:
             continue
     
-    # Check for repeated patterns
-    for i in range(len(challenges)):
-        for j in range(i+1, len(challenges)):
-            if challenges[i] == challenges[j]:
-                weak_patterns.append(f"Repeated challenge: {i} == {j}")
+    # Check for repeated patterns (one linear pass instead of comparing every pair)
+    repeated_positions = defaultdict(list)
+    for i, challenge in enumerate(challenges):
+        if challenge_counts[challenge] > 1:
+            repeated_positions[challenge].append(i)
+
+    for positions in repeated_positions.values():
+        weak_patterns.append(f"Repeated challenge: {' == '.join(str(i) for i in positions)}")
     
     if weak_patterns:
-        print("WEAK PATTERNS DETECTED:")
+        out("WEAK PATTERNS DETECTED:")
         for pattern in weak_patterns:
-            print(f"  - {pattern}")
+            out(f"  - {pattern}")
     else:
-        print("  No obvious weak patterns detected")
+        out("  No obvious weak patterns detected")
     
     # Analyze entropy
-    print("\nEntropy analysis:")
-    for i, challenge in enumerate(challenges[:5]):
-        try:
-            challenge_bytes = bytes.fromhex(challenge)
-            entropy = calculate_entropy(challenge_bytes)
-            print(f"  Challenge {i+1}: {entropy:.3f}")
-        except ValueError:
-            print(f"  Challenge {i+1}: Invalid hex")
+    out("\nEntropy analysis:")
+    for i, code in enumerate(challenge_codes[:5]):
+        entropy = calculate_entropy(code['challenge_bytes'])
+        out(f"  Challenge {i+1}: {entropy:.3f}")
+    
+    print("\n".join(lines))
 
 def analyze_timing_patterns(rolling_codes):
     """Analyze timing patterns in rolling codes"""
@@ -341,35 +301,44 @@ def analyze_timing_patterns(rolling_codes):
         print("No rolling codes found")
         return
     
+    lines = []
+    out = lines.append
+    
     # Group by device
-    machine_codes = [code for code in rolling_codes if code['device'] == 'machine']
-    modem_codes = [code for code in rolling_codes if code['device'] == 'modem']
+    machine_codes = [code for code in rolling_codes if code['device'] == MACHINE]
+    modem_codes = [code for code in rolling_codes if code['device'] == MODEM]
     
-    print(f"Machine codes: {len(machine_codes)}")
-    print(f"Modem codes: {len(modem_codes)}")
+    out(f"Machine codes: {len(machine_codes)}")
+    out(f"Modem codes: {len(modem_codes)}")
     
     # Analyze timing intervals
     if len(machine_codes) > 1:
-        print("\nMachine timing intervals:")
+        out("\nMachine timing intervals:")
         for i in range(1, len(machine_codes)):
             interval = machine_codes[i]['timestamp'] - machine_codes[i-1]['timestamp']
-            print(f"  Interval {i}: {interval}s")
+            out(f"  Interval {i}: {interval}s")
     
     if len(modem_codes) > 1:
-        print("\nModem timing intervals:")
+        out("\nModem timing intervals:")
         for i in range(1, len(modem_codes)):
             interval = modem_codes[i]['timestamp'] - modem_codes[i-1]['timestamp']
-            print(f"  Interval {i}: {interval}s")
+            out(f"  Interval {i}: {interval}s")
     
     # Analyze challenge-response timing
-    print("\nChallenge-Response timing:")
+    out("\nChallenge-Response timing:")
+    # Both lists are in timestamp order, so walk them together instead of
+    # rescanning modem_codes for every challenge
+    j = 0
     for i, machine_code in enumerate(machine_codes):
         # Find corresponding modem response
-        for modem_code in modem_codes:
-            if modem_code['timestamp'] > machine_code['timestamp']:
-                response_time = modem_code['timestamp'] - machine_code['timestamp']
-                print(f"  Challenge {i+1} -> Response: {response_time}s")
-                break
+        while j < len(modem_codes) and modem_codes[j]['timestamp'] <= machine_code['timestamp']:
+            j += 1
+        if j == len(modem_codes):
+            break
+        response_time = modem_codes[j]['timestamp'] - machine_code['timestamp']
+        out(f"  Challenge {i+1} -> Response: {response_time}s")
+    
+    print("\n".join(lines))
 
 def main():
     filename = "rolling.txt"
@@ -3,69 +3,141 @@
 Extract and analyze duplicate challenge pairs from rolling.txt
 """
 
-import re
-from collections import defaultdict, Counter
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import pairwise, repeat
+import os
 import sys
+from dataclasses import dataclass
 
-def extract_rolling_codes_with_context(filename):
-    """Extract rolling codes with full context"""
+from rolling_io import group_power_cycles
+
+@dataclass(slots=True)
+class RollingCode:
+    """Type 25 40 authentication message with its position in the capture"""
+    line_number: int
+    timestamp: int
+    device: str
+    challenge: str
+    response: str
+    full_data: str
+
+# Captures smaller than this are parsed in-process; worker startup would cost more
+PARALLEL_MIN_SIZE = 4 * 1024 * 1024
+
+def _extract_chunk(filename, start, end):
+    """Extract rolling codes from the lines in bytes [start, end) of filename
+
+    Line numbers are relative to the chunk; returns (codes, number of lines in the chunk).
+    """
     rolling_codes = []
+    add_code = rolling_codes.append
+    line_num = 0
     
-    with open(filename, 'r') as f:
-        lines = f.readlines()
-    
-    for line_num, line in enumerate(lines, 1):
-        line = line.strip()
-        if not line:
-            continue
-            
-        parts = line.split(' - ', 1)
-        if len(parts) != 2:
-            continue
-            
-        prefix = parts[0]
-        data = parts[1]
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        pos = start
         
-        # Extract timestamp and device
-        timestamp_match = re.search(r'(\d+)', prefix)
-        if not timestamp_match:
-            continue
+        # Stream the range line by line, parse on bytes and only decode the fields kept in RollingCode
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            line_num += 1
+            if b' - ff ff 25 40' not in line:
+                continue
             
-        timestamp = int(timestamp_match.group(1))
-        device = prefix.split()[0]
-        
-        # Analyze Type 25 40 (Authentication messages)
-        if data.startswith("ff ff 25 40"):
+            prefix, _, data = line.partition(b' - ')
+            data = data.rstrip()
+            
+            # Analyze Type 25 40 (Authentication messages)
+            if not data.startswith(b"ff ff 25 40"):
+                continue
             hex_parts = data.split()
-            if len(hex_parts) >= 15:
-                # Extract challenge and response
-                challenge = "".join(hex_parts[8:16])  # 8 bytes challenge
-                response = "".join(hex_parts[16:])    # Encrypted response
-                
-                rolling_codes.append({
-                    'line_number': line_num,
-                    'timestamp': timestamp,
-                    'device': device,
-                    'challenge': challenge,
-                    'response': response,
-                    'full_data': data,
-                    'hex_parts': hex_parts
-                })
-    
-    return rolling_codes
+            if len(hex_parts) < 15:
+                continue
+            
+            # Extract timestamp and device from "<device> <timestamp>"; the few device
+            # names are interned so every code shares one string per device
+            tokens = prefix.split()
+            try:
+                device = sys.intern(tokens[0].decode())
+                timestamp = int(tokens[1])
+            except (IndexError, ValueError):
+                continue
+            
+            add_code(RollingCode(
+                line_number=line_num,
+                timestamp=timestamp,
+                device=device,
+                challenge=b"".join(hex_parts[8:16]).decode(),  # 8 bytes challenge
+                response=b"".join(hex_parts[16:]).decode(),    # Encrypted response
+                full_data=data.decode()
+            ))
+    
+    return rolling_codes, line_num
 
-def find_duplicate_challenges(rolling_codes):
-    """Find and analyze duplicate challenges"""
-    challenge_groups = defaultdict(list)
+def _chunk_bounds(filename, size, chunk_count):
+    """Split a file into up to chunk_count byte ranges that start on line boundaries"""
+    bounds = [0]
     
-    # Group by challenge
-    for code in rolling_codes:
-        challenge_groups[code['challenge']].append(code)
+    with open(filename, 'rb') as f:
+        for i in range(1, chunk_count):
+            # Skip to the start of the next full line
+            f.seek(size * i // chunk_count)
+            f.readline()
+            pos = f.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
     
-    # Find duplicates
-    duplicates = {challenge: codes for challenge, codes in challenge_groups.items() if len(codes) > 1}
+    bounds.append(size)
+    return bounds
+
+def extract_rolling_codes_with_context(filename):
+    """Extract rolling codes with full context and group them into power cycles
+
+    Large captures are split into line-aligned chunks parsed in worker processes.
+    """
+    size = os.path.getsize(filename)
+    workers = os.cpu_count() or 1
     
-    return duplicates
+    if size < PARALLEL_MIN_SIZE or workers == 1:
+        chunks = [_extract_chunk(filename, 0, size)]
+    else:
+        bounds = _chunk_bounds(filename, size, workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_extract_chunk, repeat(filename), bounds[:-1], bounds[1:]))
+    
+    rolling_codes = []
+    line_offset = 0
+    
+    # Chunks come back in file order; shift their line numbers to absolute ones
+    for codes, line_count in chunks:
+        for code in codes:
+            code.line_number += line_offset
+        rolling_codes.extend(codes)
+        line_offset += line_count
+    
+    power_cycles = group_power_cycles(rolling_codes, [code.timestamp for code in rolling_codes])
+    
+    return rolling_codes, power_cycles
+
+def find_duplicate_challenges(rolling_codes):
+    """Find duplicate challenges, returning them with the number of distinct challenges seen"""
+    # Count the challenge column in one Counter pass, then group only the repeated
+    # challenges; most occur once and never get a list
+    challenges = [code.challenge for code in rolling_codes]
+    counts = Counter(challenges)
+    
+    duplicates = {}
+    for challenge, code in zip(challenges, rolling_codes):
+        if counts[challenge] > 1:
+            group = duplicates.get(challenge)
+            if group is None:
+                group = duplicates[challenge] = []
+            group.append(code)
+    
+    return duplicates, len(counts)
 
 def analyze_duplicate_patterns(duplicates):
     """Analyze patterns in duplicate challenges"""
@@ -79,105 +151,37 @@ def analyze_duplicate_patterns(duplicates):
     
     for challenge, codes in duplicates.items():
         print(f"\nChallenge: {challenge}")
-        print(f"  Occurrences: {len(codes)}")
+        occurrences = len(codes)
+        print(f"  Occurrences: {occurrences}")
         
+        # Collect responses while printing each occurrence
+        responses = set()
         for i, code in enumerate(codes):
+            responses.add(code.response)
             print(f"  Occurrence {i+1}:")
-            print(f"    Line: {code['line_number']}")
-            print(f"    Timestamp: {code['timestamp']}")
-            print(f"    Device: {code['device']}")
-            print(f"    Response: {code['response'][:32]}...")
+            print(f"    Line: {code.line_number}")
+            print(f"    Timestamp: {code.timestamp}")
+            print(f"    Device: {code.device}")
+            print(f"    Response: {code.response:.32}...")
         
-        # Analyze timing between duplicates
-        if len(codes) > 1:
-            print(f"  Timing analysis:")
-            for i in range(1, len(codes)):
-                time_diff = codes[i]['timestamp'] - codes[i-1]['timestamp']
-                print(f"    Time between occurrence {i} and {i+1}: {time_diff}s")
+        # Analyze timing between duplicates (every duplicate has at least two occurrences)
+        print(f"  Timing analysis:")
+        for i, (prev, code) in enumerate(pairwise(codes), 1):
+            time_diff = code.timestamp - prev.timestamp
+            print(f"    Time between occurrence {i} and {i+1}: {time_diff}s")
         
         # Analyze responses for duplicates
-        responses = [code['response'] for code in codes]
-        unique_responses = set(responses)
-        print(f"  Unique responses: {len(unique_responses)}")
+        unique_responses = len(responses)
+        print(f"  Unique responses: {unique_responses}")
         
-        if len(unique_responses) == len(responses):
+        if unique_responses == occurrences:
             print("  All responses are unique")
         else:
             print("  WARNING: Some responses are identical")
 
-def create_duplicate_mapping_file(duplicates, filename="duplicate_challenges_mapping.txt"):
-    """Create detailed mapping file of duplicate challenges"""
-    
-    with open(filename, 'w') as f:
-        f.write("# Duplicate Challenge Pairs Mapping\n")
-        f.write("# Generated from rolling.txt analysis\n")
-        f.write("# Format: Challenge -> [Occurrences with context]\n\n")
-        
-        if not duplicates:
-            f.write("No duplicate challenges found.\n")
-            return
-        
-        f.write(f"Total duplicate challenges: {len(duplicates)}\n\n")
-        
-        for challenge, codes in duplicates.items():
-            f.write(f"## Challenge: {challenge}\n")
-            f.write(f"Occurrences: {len(codes)}\n\n")
-            
-            for i, code in enumerate(codes):
-                f.write(f"### Occurrence {i+1}\n")
-                f.write(f"Line Number: {code['line_number']}\n")
-                f.write(f"Timestamp: {code['timestamp']}\n")
-                f.write(f"Device: {code['device']}\n")
-                f.write(f"Response: {code['response']}\n")
-                f.write(f"Full Data: {code['full_data']}\n")
-                f.write("\n")
-            
-            # Timing analysis
-            if len(codes) > 1:
-                f.write("### Timing Analysis\n")
-                for i in range(1, len(codes)):
-                    time_diff = codes[i]['timestamp'] - codes[i-1]['timestamp']
-                    f.write(f"Time between occurrence {i} and {i+1}: {time_diff}s\n")
-                f.write("\n")
-            
-            # Response analysis
-            responses = [code['response'] for code in codes]
-            unique_responses = set(responses)
-            f.write("### Response Analysis\n")
-            f.write(f"Unique responses: {len(unique_responses)} out of {len(responses)}\n")
-            
-            if len(unique_responses) == len(responses):
-                f.write("All responses are unique - encryption is working correctly\n")
-            else:
-                f.write("WARNING: Some responses are identical - potential encryption flaw\n")
-            
-            f.write("\n" + "="*80 + "\n\n")
-    
-    print(f"Duplicate challenge mapping saved to: {filename}")
-
-def analyze_power_cycle_context(rolling_codes, duplicates):
+def analyze_power_cycle_context(power_cycles, duplicates):
     """Analyze duplicate challenges in context of power cycles"""
     
-    # Find power cycles
-    power_cycles = []
-    current_cycle = []
-    
-    for code in rolling_codes:
-        if not current_cycle:
-            current_cycle = [code]
-        else:
-            # Check if this is a new power cycle (large time gap)
-            time_diff = code['timestamp'] - current_cycle[-1]['timestamp']
-            if time_diff > 30:  # More than 30 seconds
-                if len(current_cycle) > 1:
-                    power_cycles.append(current_cycle)
-                current_cycle = [code]
-            else:
-                current_cycle.append(code)
-    
-    if len(current_cycle) > 1:
-        power_cycles.append(current_cycle)
-    
     print(f"\n=== POWER CYCLE CONTEXT ANALYSIS ===")
     print(f"Total power cycles: {len(power_cycles)}")
     
@@ -185,7 +189,7 @@ def analyze_power_cycle_context(rolling_codes, duplicates):
     duplicate_cycles = []
     
     for cycle_num, cycle in enumerate(power_cycles):
-        cycle_challenges = [code['challenge'] for code in cycle if code['device'] == 'machine']
+        cycle_challenges = [code.challenge for code in cycle if code.device == 'machine']
         
         # Check if this cycle contains any duplicate challenges
         cycle_duplicates = []
@@ -199,100 +203,154 @@ def analyze_power_cycle_context(rolling_codes, duplicates):
     
     return duplicate_cycles
 
-def create_detailed_analysis_report(rolling_codes, duplicates, duplicate_cycles):
-    """Create comprehensive analysis report"""
+def create_duplicate_reports(rolling_codes, duplicates, duplicate_cycles, unique_challenge_count,
+                             mapping_filename="duplicate_challenges_mapping.txt",
+                             report_filename="duplicate_challenges_detailed_analysis.md"):
+    """Create the duplicate mapping file and the detailed markdown report in one pass over duplicates"""
     
-    with open("duplicate_challenges_detailed_analysis.md", 'w') as f:
-        f.write("# Duplicate Challenge Detailed Analysis\n\n")
-        
-        f.write("## Executive Summary\n")
-        f.write(f"- Total rolling code messages analyzed: {len(rolling_codes)}\n")
-        f.write(f"- Duplicate challenges found: {len(duplicates)}\n")
-        f.write(f"- Power cycles containing duplicates: {len(duplicate_cycles)}\n\n")
+    # Collect each file's text and write it with a single call per file
+    mapping_lines = []
+    report_lines = []
+    mapping = mapping_lines.append
+    report = report_lines.append
+    
+    mapping("# Duplicate Challenge Pairs Mapping\n")
+    mapping("# Generated from rolling.txt analysis\n")
+    mapping("# Format: Challenge -> [Occurrences with context]\n\n")
+    
+    if not duplicates:
+        mapping("No duplicate challenges found.\n")
+    else:
+        mapping(f"Total duplicate challenges: {len(duplicates)}\n\n")
+    
+    report("# Duplicate Challenge Detailed Analysis\n\n")
+    
+    report("## Executive Summary\n")
+    report(f"- Total rolling code messages analyzed: {len(rolling_codes)}\n")
+    report(f"- Duplicate challenges found: {len(duplicates)}\n")
+    report(f"- Power cycles containing duplicates: {len(duplicate_cycles)}\n\n")
+    
+    report("## Duplicate Challenge Details\n\n")
+    
+    for challenge, codes in duplicates.items():
+        # Mapping file section
+        mapping(f"## Challenge: {challenge}\n")
+        occurrences = len(codes)
+        mapping(f"Occurrences: {occurrences}\n\n")
         
-        f.write("## Duplicate Challenge Details\n\n")
+        responses = set()
+        for i, code in enumerate(codes):
+            responses.add(code.response)
+            mapping(f"### Occurrence {i+1}\n")
+            mapping(f"Line Number: {code.line_number}\n")
+            mapping(f"Timestamp: {code.timestamp}\n")
+            mapping(f"Device: {code.device}\n")
+            mapping(f"Response: {code.response}\n")
+            mapping(f"Full Data: {code.full_data}\n")
+            mapping("\n")
         
-        for challenge, codes in duplicates.items():
-            f.write(f"### Challenge: `{challenge}`\n")
-            f.write(f"- **Occurrences**: {len(codes)}\n")
-            f.write(f"- **First occurrence**: Line {codes[0]['line_number']}, Timestamp {codes[0]['timestamp']}\n")
-            f.write(f"- **Last occurrence**: Line {codes[-1]['line_number']}, Timestamp {codes[-1]['timestamp']}\n")
-            
-            if len(codes) > 1:
-                time_span = codes[-1]['timestamp'] - codes[0]['timestamp']
-                f.write(f"- **Time span**: {time_span} seconds\n")
-            
-            f.write("\n#### Occurrences:\n")
-            for i, code in enumerate(codes):
-                f.write(f"{i+1}. Line {code['line_number']}, Timestamp {code['timestamp']}, Device: {code['device']}\n")
-                f.write(f"   Response: `{code['response'][:32]}...`\n")
-            
-            f.write("\n")
+        # Timing analysis
+        mapping("### Timing Analysis\n")
+        for i, (prev, code) in enumerate(pairwise(codes), 1):
+            time_diff = code.timestamp - prev.timestamp
+            mapping(f"Time between occurrence {i} and {i+1}: {time_diff}s\n")
+        mapping("\n")
         
-        f.write("## Power Cycle Analysis\n\n")
-        f.write("### Power Cycles with Duplicate Challenges\n\n")
+        # Response analysis
+        unique_responses = len(responses)
+        mapping("### Response Analysis\n")
+        mapping(f"Unique responses: {unique_responses} out of {occurrences}\n")
         
-        for cycle_num, duplicate_challenges in duplicate_cycles:
-            f.write(f"**Power Cycle {cycle_num}**:\n")
-            for challenge in duplicate_challenges:
-                f.write(f"- Challenge: `{challenge}`\n")
-            f.write("\n")
+        if unique_responses == occurrences:
+            mapping("All responses are unique - encryption is working correctly\n")
+        else:
+            mapping("WARNING: Some responses are identical - potential encryption flaw\n")
         
-        f.write("## Security Implications\n\n")
-        f.write("### Vulnerabilities Identified\n")
-        f.write("1. **Replay Attack Risk**: Duplicate challenges can be replayed\n")
-        f.write("2. **Challenge Generation Flaw**: PRNG or challenge algorithm has issues\n")
-        f.write("3. **Predictable Patterns**: Duplicates occur in specific power cycles\n\n")
+        mapping("\n" + "="*80 + "\n\n")
         
-        f.write("### Recommendations\n")
-        f.write("1. **Immediate**: Fix challenge generation algorithm\n")
-        f.write("2. **Short-term**: Implement challenge uniqueness validation\n")
-        f.write("3. **Long-term**: Upgrade to stronger cryptographic protocols\n\n")
+        # Report section
+        report(f"### Challenge: `{challenge}`\n")
+        report(f"- **Occurrences**: {occurrences}\n")
+        report(f"- **First occurrence**: Line {codes[0].line_number}, Timestamp {codes[0].timestamp}\n")
+        report(f"- **Last occurrence**: Line {codes[-1].line_number}, Timestamp {codes[-1].timestamp}\n")
         
-        f.write("## Technical Details\n\n")
-        f.write("### Challenge Format Analysis\n")
-        f.write("- Format: `00 12 10 02 00 01 [4-byte rolling code]`\n")
-        f.write("- Rolling code length: 4 bytes (32 bits)\n")
-        f.write("- Total possible values: 2^32 = 4,294,967,296\n")
-        f.write("- Duplicate rate: {:.1f}%\n".format(len(duplicates) / len(set(code['challenge'] for code in rolling_codes)) * 100))
+        time_span = codes[-1].timestamp - codes[0].timestamp
+        report(f"- **Time span**: {time_span} seconds\n")
         
-        f.write("\n### Response Analysis\n")
-        responses = [code['response'] for code in rolling_codes]
-        unique_responses = len(set(responses))
-        f.write(f"- Total responses: {len(responses)}\n")
-        f.write(f"- Unique responses: {unique_responses}\n")
-        f.write(f"- Response uniqueness rate: {unique_responses/len(responses)*100:.1f}%\n")
+        report("\n#### Occurrences:\n")
+        for i, code in enumerate(codes):
+            report(f"{i+1}. Line {code.line_number}, Timestamp {code.timestamp}, Device: {code.device}\n")
+            report(f"   Response: `{code.response:.32}...`\n")
         
-        if unique_responses == len(responses):
-            f.write("- **Encryption is working correctly** - all responses are unique\n")
-        else:
-            f.write("- **WARNING**: Some responses are identical - encryption flaw detected\n")
+        report("\n")
+    
+    report("## Power Cycle Analysis\n\n")
+    report("### Power Cycles with Duplicate Challenges\n\n")
     
-    print("Detailed analysis report saved to: duplicate_challenges_detailed_analysis.md")
+    for cycle_num, duplicate_challenges in duplicate_cycles:
+        report(f"**Power Cycle {cycle_num}**:\n")
+        for challenge in duplicate_challenges:
+            report(f"- Challenge: `{challenge}`\n")
+        report("\n")
+    
+    report("## Security Implications\n\n")
+    report("### Vulnerabilities Identified\n")
+    report("1. **Replay Attack Risk**: Duplicate challenges can be replayed\n")
+    report("2. **Challenge Generation Flaw**: PRNG or challenge algorithm has issues\n")
+    report("3. **Predictable Patterns**: Duplicates occur in specific power cycles\n\n")
+    
+    report("### Recommendations\n")
+    report("1. **Immediate**: Fix challenge generation algorithm\n")
+    report("2. **Short-term**: Implement challenge uniqueness validation\n")
+    report("3. **Long-term**: Upgrade to stronger cryptographic protocols\n\n")
+    
+    report("## Technical Details\n\n")
+    report("### Challenge Format Analysis\n")
+    report("- Format: `00 12 10 02 00 01 [4-byte rolling code]`\n")
+    report("- Rolling code length: 4 bytes (32 bits)\n")
+    report("- Total possible values: 2^32 = 4,294,967,296\n")
+    report("- Duplicate rate: {:.1f}%\n".format(len(duplicates) / unique_challenge_count * 100))
+    
+    report("\n### Response Analysis\n")
+    total_responses = len(rolling_codes)
+    unique_responses = len({code.response for code in rolling_codes})
+    report(f"- Total responses: {total_responses}\n")
+    report(f"- Unique responses: {unique_responses}\n")
+    report(f"- Response uniqueness rate: {unique_responses/total_responses*100:.1f}%\n")
+    
+    if unique_responses == total_responses:
+        report("- **Encryption is working correctly** - all responses are unique\n")
+    else:
+        report("- **WARNING**: Some responses are identical - encryption flaw detected\n")
+    
+    with open(mapping_filename, 'w') as f:
+        f.write("".join(mapping_lines))
+    with open(report_filename, 'w') as f:
+        f.write("".join(report_lines))
+    
+    print(f"Duplicate challenge mapping saved to: {mapping_filename}")
+    print(f"Detailed analysis report saved to: {report_filename}")
 
 def main():
     filename = "rolling.txt"
     
     try:
         print("Extracting rolling codes from rolling.txt...")
-        rolling_codes = extract_rolling_codes_with_context(filename)
+        rolling_codes, power_cycles = extract_rolling_codes_with_context(filename)
         print(f"Found {len(rolling_codes)} rolling code messages")
         
         print("\nFinding duplicate challenges...")
-        duplicates = find_duplicate_challenges(rolling_codes)
+        duplicates, unique_challenge_count = find_duplicate_challenges(rolling_codes)
         print(f"Found {len(duplicates)} duplicate challenges")
         
         print("\nAnalyzing duplicate patterns...")
         analyze_duplicate_patterns(duplicates)
         
-        print("\nCreating duplicate mapping file...")
-        create_duplicate_mapping_file(duplicates)
-        
         print("\nAnalyzing power cycle context...")
-        duplicate_cycles = analyze_power_cycle_context(rolling_codes, duplicates)
+        duplicate_cycles = analyze_power_cycle_context(power_cycles, duplicates)
         
-        print("\nCreating detailed analysis report...")
-        create_detailed_analysis_report(rolling_codes, duplicates, duplicate_cycles)
+        print("\nCreating duplicate mapping file and detailed analysis report...")
+        create_duplicate_reports(rolling_codes, duplicates, duplicate_cycles, unique_challenge_count)
         
         print("\nAnalysis complete!")
         print("Files created:")
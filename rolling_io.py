@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Shared loader for rolling.txt captures, parsed once and cached on disk
+"""
+
+from itertools import pairwise
+import marshal
+import mmap
+import os
+import tempfile
+
+# Bump when the record layout changes so stale caches are ignored
+_CACHE_VERSION = 5
+
+# Device ids stored in parsed records; DEVICE_NAMES maps them back for display.
+# Other sources get the next free id the first time they are seen.
+MODEM = 0
+MACHINE = 1
+DEVICE_NAMES = ['modem', 'machine']
+_DEVICE_IDS = {name.encode(): device_id for device_id, name in enumerate(DEVICE_NAMES)}
+
+def _add_device(name):
+    """Assign the next device id to a source name seen for the first time"""
+    device = _DEVICE_IDS[name] = len(DEVICE_NAMES)
+    DEVICE_NAMES.append(name.decode())
+    return device
+
+def iter_lines(filename):
+    """Yield the raw lines of filename as bytes, read through mmap"""
+    with open(filename, 'rb') as f:
+        # mmap refuses empty files
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        # Work on bytes straight from the page cache
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter(mm.readline, b'')
+
+def decode_packet(data):
+    """Decode space-separated hex to bytes, stopping at the first token that is not valid hex"""
+    try:
+        return bytes.fromhex(data)
+    except ValueError:
+        pass
+
+    # Keep the bytes before the bad token so the fields ahead of it stay usable
+    packet = bytearray()
+    for token in data.split():
+        try:
+            packet += bytes.fromhex(token)
+        except ValueError:
+            break
+    return bytes(packet)
+
+def parse_rolling_file(filename):
+    """Parse "<device> <timestamp> - <data>" lines into (timestamp, device, data, packet) records
+
+    device is MODEM, MACHINE or the id given to another source in DEVICE_NAMES. packet is the
+    hex data decoded to bytes once here, up to the first token that is not valid hex.
+    """
+    records = []
+
+    # Only the data field is decoded
+    for line in iter_lines(filename):
+        prefix, sep, data = line.partition(b' - ')
+        if not sep:
+            continue
+
+        # Prefix is "<device> <timestamp> ..."; anything after the timestamp is ignored
+        tokens = prefix.split(None, 2)
+        if len(tokens) < 2 or not tokens[1].isdigit():
+            continue
+        device = _DEVICE_IDS.get(tokens[0])
+        if device is None:
+            device = _add_device(tokens[0])
+        timestamp = int(tokens[1])
+
+        data = data.rstrip().decode()
+        records.append((timestamp, device, data, decode_packet(data)))
+
+    return records
+
+def _remap_devices(records, device_names):
+    """Translate cached device ids, which index device_names, to the ids used in this process"""
+    ids = [_DEVICE_IDS.get(name.encode()) for name in device_names]
+    for device_id, name in enumerate(device_names):
+        if ids[device_id] is None:
+            ids[device_id] = _add_device(name.encode())
+
+    # Usually the cache was written with the same table and nothing changes
+    if ids == list(range(len(ids))):
+        return records
+    return [(timestamp, ids[device], data, packet) for timestamp, device, data, packet in records]
+
+def load_rolling_file(filename):
+    """Load parsed records, reusing the cache while the capture file is unchanged
+
+    The cache is stored with marshal, which only rebuilds plain values and never runs
+    code, so a cache file planted next to a capture cannot execute anything.
+    """
+    stat = os.stat(filename)
+    key = (_CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+    cache_file = filename + '.cache'
+
+    # The key is stored first so a stale cache is rejected before its records are read
+    try:
+        with open(cache_file, 'rb') as f:
+            if marshal.load(f) == key:
+                device_names = marshal.load(f)
+                records = marshal.load(f)
+                return _remap_devices(records, device_names)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    records = parse_rolling_file(filename)
+
+    # Write to a temporary file and rename it into place, so an interrupted run or a
+    # concurrent reader never sees a partial cache. The cache is only an optimization;
+    # ignore read-only directories.
+    try:
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file) or '.', prefix='.rolling-cache-')
+    except OSError:
+        return records
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            marshal.dump(key, f)
+            marshal.dump(tuple(DEVICE_NAMES), f)
+            marshal.dump(records, f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+    return records
+
+def power_cycle_bounds(timestamps, max_gap=30):
+    """(start, end) index pairs of the power cycles in time-ordered timestamps
+
+    A gap of more than max_gap seconds starts a new cycle; cycles with a single
+    message are dropped.
+    """
+    starts = [0]
+    starts += [i for i, (prev, curr) in enumerate(pairwise(timestamps), 1) if curr - prev > max_gap]
+    starts.append(len(timestamps))
+    return [(start, end) for start, end in pairwise(starts) if end - start > 1]
+
+def group_power_cycles(records, timestamps, max_gap=30):
+    """Split time-ordered records into power cycles; timestamps holds one entry per record"""
+    return [records[start:end] for start, end in power_cycle_bounds(timestamps, max_gap)]
@@ -3,203 +3,222 @@
 State machine analysis of the rolling code protocol
 """
 
-import re
 from collections import defaultdict, Counter
+from dataclasses import dataclass, field
+from itertools import compress, pairwise
+from operator import eq, sub
 import sys
 
+from rolling_io import DEVICE_NAMES, load_rolling_file
+
+@dataclass(slots=True)
+class StateStream:
+    """Parsed messages stored column-wise; states holds one STATE_IDS id per message"""
+    timestamps: list = field(default_factory=list)
+    devices: list = field(default_factory=list)
+    data: list = field(default_factory=list)
+    states: bytearray = field(default_factory=bytearray)
+    # Index where each power cycle starts (it begins with POWER_RESET), plus len(states)
+    cycle_bounds: list = field(default_factory=list)
+    
+    def __len__(self):
+        return len(self.states)
+
 def extract_state_transitions(filename):
-    """Extract state transitions from the protocol data"""
-    
-    states = []
-    transitions = []
-    
-    with open(filename, 'r') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-                
-            parts = line.split(' - ', 1)
-            if len(parts) != 2:
-                continue
-                
-            prefix = parts[0]
-            data = parts[1]
-            
-            # Extract timestamp and device
-            timestamp_match = re.search(r'(\d+)', prefix)
-            if not timestamp_match:
-                continue
-                
-            timestamp = int(timestamp_match.group(1))
-            device = prefix.split()[0]
-            
-            # Determine state based on message type
-            state = determine_state(data, device)
-            
-            states.append({
-                'timestamp': timestamp,
-                'device': device,
-                'data': data,
-                'state': state,
-                'line': line_num
-            })
-    
-    # Build transition matrix
-    for i in range(1, len(states)):
-        prev_state = states[i-1]
-        curr_state = states[i]
-        
-        transition = {
-            'from': prev_state['state'],
-            'to': curr_state['state'],
-            'device': curr_state['device'],
-            'timestamp': curr_state['timestamp'],
-            'time_diff': curr_state['timestamp'] - prev_state['timestamp'],
-            'data': curr_state['data']
-        }
-        
-        transitions.append(transition)
-    
-    return states, transitions
+    """Extract the state stream from the protocol data
 
-def determine_state(data, device):
-    """Determine the current state based on message data"""
+    Transitions are not stored; they are the adjacent pairs of the stream's columns.
+    """
     
-    # Power cycle states
-    if data == "00":
-        return "POWER_RESET"
+    stream = StateStream()
     
-    # Session initialization states
-    if data.startswith("ff ff 0a 00"):
-        return "SESSION_START"
+    # Captures repeat the same few payloads (heartbeats, status polls), so each distinct
+    # (data, device) pair is classified once
+    state_cache = {}
     
-    if data.startswith("ff ff 08 40") and "70" in data:
-        return "CONTROLLER_READY"
+    # The capture is parsed (and cached) by the loader shared with the other analysis scripts
+    for timestamp, device, data, packet in load_rolling_file(filename):
+        device = DEVICE_NAMES[device]
+        
+        # Determine state based on message type
+        key = (data, device)
+        state = state_cache.get(key)
+        if state is None:
+            state = state_cache[key] = STATE_IDS[determine_state(data, device)]
+        
+        stream.timestamps.append(timestamp)
+        stream.devices.append(device)
+        stream.data.append(data)
+        stream.states.append(state)
     
-    if data.startswith("ff ff 0a 40") and "01 4d 01" in data:
-        return "HANDSHAKE_INIT"
+    # Power cycle boundaries are shared by every analyzer that splits on POWER_RESET
+    stream.cycle_bounds = segment_starts(stream.states, POWER_RESET_ID) + [len(stream)]
     
-    if data.startswith("ff ff 08 40") and "73" in data:
-        return "HANDSHAKE_ACK"
+    return stream
+
+# (state, frame prefix, substring) in priority order; a rule matches when the data starts
+# with the frame prefix and contains the substring (None matches any data). The first
+# matching rule wins. POWER_RESET ("00" on its own) is checked separately.
+_STATE_RULES = [
+    # Session initialization states
+    ("SESSION_START", "ff ff 0a 00", None),
+    ("CONTROLLER_READY", "ff ff 08 40", "70"),
+    ("HANDSHAKE_INIT", "ff ff 0a 40", "01 4d 01"),
+    ("HANDSHAKE_ACK", "ff ff 08 40", "73"),
     
     # Device identification states
-    if data.startswith("ff ff 19 40") and "11 00 f0" in data:
-        return "DEVICE_ID"
+    ("DEVICE_ID", "ff ff 19 40", "11 00 f0"),
+    ("FIRMWARE_INFO", "ff ff 2e 40", "62"),
+    ("MODEL_INFO", "ff ff 2e 40", "ec"),
+    ("SERIAL_INFO", "ff ff 2c 40", "ea"),
     
-    if data.startswith("ff ff 2e 40") and "62" in data:
-        return "FIRMWARE_INFO"
-    
-    if data.startswith("ff ff 2e 40") and "ec" in data:
-        return "MODEL_INFO"
-    
-    if data.startswith("ff ff 2c 40") and "ea" in data:
-        return "SERIAL_INFO"
-    
-    # Authentication states
-    if data.startswith("ff ff 25 40") and device == "machine":
-        return "AUTH_CHALLENGE"
-    
-    if data.startswith("ff ff 25 40") and device == "modem":
-        return "AUTH_RESPONSE"
+    # Authentication states (split into AUTH_CHALLENGE/AUTH_RESPONSE by device)
+    ("AUTH", "ff ff 25 40", None),
     
     # Status and control states
-    if data.startswith("ff ff 43 40") and "6d 01" in data:
-        return "STATUS_RESPONSE"
-    
-    if data.startswith("ff ff 46 40") and "6d 02" in data:
-        return "DATA_RESPONSE"
-    
-    if data.startswith("ff ff 0a 40") and "f3" in data:
-        return "STATUS_QUERY"
-    
-    if data.startswith("ff ff 0a 40") and "f5" in data:
-        return "QUERY_ACK"
+    ("STATUS_RESPONSE", "ff ff 43 40", "6d 01"),
+    ("DATA_RESPONSE", "ff ff 46 40", "6d 02"),
+    ("STATUS_QUERY", "ff ff 0a 40", "f3"),
+    ("QUERY_ACK", "ff ff 0a 40", "f5"),
     
     # Program control states
-    if data.startswith("ff ff 0e 40") and "60" in data:
-        return "PROGRAM_COMMAND"
-    
-    if data.startswith("ff ff 0c 40") and "5d 1f" in data:
-        return "RESET_COMMAND"
-    
-    if data.startswith("ff ff 12 40") and "0f 5a" in data:
-        return "RESET_CONFIRM"
+    ("PROGRAM_COMMAND", "ff ff 0e 40", "60"),
+    ("RESET_COMMAND", "ff ff 0c 40", "5d 1f"),
+    ("RESET_CONFIRM", "ff ff 12 40", "0f 5a"),
     
     # Heartbeat states
-    if data.startswith("ff ff 08 40") and "4d 61" in data:
-        return "HEARTBEAT_ACK"
-    
-    if data.startswith("ff ff 08 40") and "51 64" in data:
-        return "CONTROL_SIGNAL"
+    ("HEARTBEAT_ACK", "ff ff 08 40", "4d 61"),
+    ("CONTROL_SIGNAL", "ff ff 08 40", "51 64"),
     
     # Complex command states
-    if data.startswith("ff ff 22 40") and "f7" in data:
-        return "COMPLEX_COMMAND"
-    
-    if data.startswith("ff ff 20 40") and "11 10 00" in data:
-        return "TIMESTAMP_SYNC"
-    
-    # Default state
-    return "UNKNOWN"
+    ("COMPLEX_COMMAND", "ff ff 22 40", "f7"),
+    ("TIMESTAMP_SYNC", "ff ff 20 40", "11 10 00"),
+]
+
+# All frame prefixes are the same length, so the prefix is looked up with one slice
+_PREFIX_LEN = 11
+
+# Rules grouped by frame prefix, in priority order within each prefix
+_FRAME_RULES = defaultdict(list)
+for _state, _prefix, _token in _STATE_RULES:
+    _FRAME_RULES[_prefix].append((_token, _state))
+
+_AUTH_STATES = {"machine": "AUTH_CHALLENGE", "modem": "AUTH_RESPONSE"}
+
+def _build_determine_state():
+    """Generate determine_state from the rule table as a decision tree
+
+    The generated function branches once on the frame prefix and then only runs the
+    substring checks of that frame's rules, instead of walking every rule in turn.
+    """
+    src = [
+        "def determine_state(data, device):",
+        '    """Determine the current state based on message data"""',
+        '    if data == "00":',
+        '        return "POWER_RESET"',
+        f"    prefix = data[:{_PREFIX_LEN}]",
+    ]
+    
+    for i, (prefix, rules) in enumerate(_FRAME_RULES.items()):
+        src.append(f"    {'if' if i == 0 else 'elif'} prefix == {prefix!r}:")
+        for token, state in rules:
+            # Auth frames from any other device match no other rule
+            result = '_AUTH_STATES.get(device, "UNKNOWN")' if state == "AUTH" else repr(state)
+            if token is None:
+                src.append(f"        return {result}")
+                break
+            src.append(f"        if {token!r} in data:")
+            src.append(f"            return {result}")
+    
+    src.append('    return "UNKNOWN"')
+    
+    namespace = {"_AUTH_STATES": _AUTH_STATES}
+    exec(compile("\n".join(src), "<determine_state>", "exec"), namespace)
+    return namespace["determine_state"]
+
+determine_state = _build_determine_state()
+
+# Every state determine_state can return, indexed by the small ids kept in StateStream.states
+STATE_NAMES = ("UNKNOWN", "POWER_RESET") + tuple(name for name, _, _ in _STATE_RULES if name != "AUTH") + tuple(_AUTH_STATES.values())
+STATE_IDS = {name: state_id for state_id, name in enumerate(STATE_NAMES)}
+POWER_RESET_ID = STATE_IDS["POWER_RESET"]
+AUTH_IDS = (STATE_IDS["AUTH_CHALLENGE"], STATE_IDS["AUTH_RESPONSE"])
+
+# bytes.translate table mapping auth state ids to 1 and every other id to 0
+_AUTH_MASK = bytes(state_id in AUTH_IDS for state_id in range(256))
+
+def segment_starts(states, state_id):
+    """Start index of each segment when states is split before every state_id message
+
+    bytearray.find does the scan in C, so only the segment boundaries reach Python.
+    """
+    starts = [0]
+    find = states.find
+    i = find(state_id, 1)
+    while i != -1:
+        starts.append(i)
+        i = find(state_id, i + 1)
+    return starts
 
-def analyze_state_machine(states, transitions):
+def analyze_state_machine(stream):
     """Analyze the state machine patterns"""
     print("=== STATE MACHINE ANALYSIS ===")
     
-    # Count state occurrences
-    state_counts = Counter([state['state'] for state in states])
-    print(f"Total states: {len(states)}")
-    print(f"Unique states: {len(state_counts)}")
+    # Buffer output and write it in one call at the end
+    lines = []
+    out = lines.append
     
-    print("\nState frequency:")
+    # Count state occurrences; state ids are small ints, so hashing is trivial
+    states = stream.states
+    state_counts = Counter(states)
+    out(f"Total states: {len(stream)}")
+    out(f"Unique states: {len(state_counts)}")
+    
+    out("\nState frequency:")
     for state, count in state_counts.most_common():
-        print(f"  {state}: {count}")
+        out(f"  {STATE_NAMES[state]}: {count}")
     
     # Analyze state transitions
-    print(f"\nTotal transitions: {len(transitions)}")
+    out(f"\nTotal transitions: {max(len(stream) - 1, 0)}")
     
     # Group transitions by type
-    transition_counts = Counter([(t['from'], t['to']) for t in transitions])
-    print(f"Unique transitions: {len(transition_counts)}")
+    transition_counts = Counter(zip(states, states[1:]))
+    out(f"Unique transitions: {len(transition_counts)}")
     
-    print("\nMost common transitions:")
+    out("\nMost common transitions:")
     for (from_state, to_state), count in transition_counts.most_common(10):
-        print(f"  {from_state} -> {to_state}: {count}")
+        out(f"  {STATE_NAMES[from_state]} -> {STATE_NAMES[to_state]}: {count}")
     
     # Analyze state sequences
-    print("\nState sequences:")
-    sequences = []
-    current_sequence = []
-    
-    for state in states:
-        if state['state'] == "POWER_RESET":
-            if current_sequence:
-                sequences.append(current_sequence)
-            current_sequence = [state['state']]
-        else:
-            current_sequence.append(state['state'])
+    out("\nState sequences:")
+    # Sequences are (start, end) index pairs into the state column; only the states
+    # that are printed get sliced out
+    sequences = [(start, end) for start, end in pairwise(stream.cycle_bounds) if end > start]
     
-    if current_sequence:
-        sequences.append(current_sequence)
+    out(f"Found {len(sequences)} state sequences")
     
-    print(f"Found {len(sequences)} state sequences")
+    for i, (start, end) in enumerate(sequences[:5]):
+        out(f"  Sequence {i+1}: {' -> '.join(STATE_NAMES[state] for state in states[start:min(end, start + 10)])}{'...' if end - start > 10 else ''}")
     
-    for i, sequence in enumerate(sequences[:5]):
-        print(f"  Sequence {i+1}: {' -> '.join(sequence[:10])}{'...' if len(sequence) > 10 else ''}")
+    print("\n".join(lines))
 
-def analyze_timing_patterns(states, transitions):
+def analyze_timing_patterns(stream):
     """Analyze timing patterns in state transitions"""
     print("\n=== TIMING PATTERN ANALYSIS ===")
     
+    lines = []
+    out = lines.append
+    
     # Analyze transition timing
-    transition_times = [t['time_diff'] for t in transitions if t['time_diff'] > 0]
+    timestamps = stream.timestamps
+    time_diffs = list(map(sub, timestamps[1:], timestamps))
+    transition_times = [time_diff for time_diff in time_diffs if time_diff > 0]
     
     if transition_times:
-        print(f"Transition timing statistics:")
-        print(f"  Min: {min(transition_times)}s")
-        print(f"  Max: {max(transition_times)}s")
-        print(f"  Average: {sum(transition_times)/len(transition_times):.2f}s")
+        out(f"Transition timing statistics:")
+        out(f"  Min: {min(transition_times)}s")
+        out(f"  Max: {max(transition_times)}s")
+        out(f"  Average: {sum(transition_times)/len(transition_times):.2f}s")
         
         # Group by time intervals
         intervals = {
@@ -209,113 +228,113 @@ def analyze_timing_patterns(states, transitions):
             'slow': [t for t in transition_times if t > 30]
         }
         
-        print("\nTransition timing distribution:")
+        out("\nTransition timing distribution:")
         for interval, times in intervals.items():
             if times:
-                print(f"  {interval}: {len(times)} transitions")
+                out(f"  {interval}: {len(times)} transitions")
     
-    # Analyze state duration
-    state_durations = defaultdict(list)
+    # Analyze state duration: mask the transitions that stay in the same state, then
+    # take per-state counts and total durations over the masked columns
+    states = stream.states
+    same_state = list(map(eq, states[1:], states))
+    repeated_states = list(compress(states[1:], same_state))
     
-    for i in range(1, len(states)):
-        prev_state = states[i-1]
-        curr_state = states[i]
-        
-        if prev_state['state'] == curr_state['state']:
-            duration = curr_state['timestamp'] - prev_state['timestamp']
-            state_durations[prev_state['state']].append(duration)
-    
-    print("\nState duration analysis:")
-    for state, durations in state_durations.items():
-        if durations:
-            avg_duration = sum(durations) / len(durations)
-            print(f"  {state}: {len(durations)} occurrences, avg {avg_duration:.2f}s")
+    duration_counts = Counter(repeated_states)
+    duration_totals = dict.fromkeys(duration_counts, 0)
+    for state, duration in zip(repeated_states, compress(time_diffs, same_state)):
+        duration_totals[state] += duration
+    
+    out("\nState duration analysis:")
+    for state, count in duration_counts.items():
+        avg_duration = duration_totals[state] / count
+        out(f"  {STATE_NAMES[state]}: {count} occurrences, avg {avg_duration:.2f}s")
+    
+    print("\n".join(lines))
 
-def analyze_authentication_flow(states, transitions):
+def analyze_authentication_flow(stream):
     """Analyze the authentication flow specifically"""
     print("\n=== AUTHENTICATION FLOW ANALYSIS ===")
     
-    # Find authentication sequences
+    lines = []
+    out = lines.append
+    
+    # Find authentication sequences (runs of auth states) as ranges of message indices.
+    # The state column is mapped to a 0/1 mask so the runs are located with find in C.
+    auth_mask = stream.states.translate(_AUTH_MASK)
     auth_sequences = []
-    current_auth = []
+    end = 0
     
-    for state in states:
-        if state['state'] in ["AUTH_CHALLENGE", "AUTH_RESPONSE"]:
-            current_auth.append(state)
-        elif current_auth:
-            auth_sequences.append(current_auth)
-            current_auth = []
+    while (start := auth_mask.find(1, end)) != -1:
+        end = auth_mask.find(0, start)
+        if end == -1:
+            end = len(auth_mask)
+        auth_sequences.append(range(start, end))
     
-    if current_auth:
-        auth_sequences.append(current_auth)
+    out(f"Found {len(auth_sequences)} authentication sequences")
     
-    print(f"Found {len(auth_sequences)} authentication sequences")
+    timestamps = stream.timestamps
+    challenge_id, response_id = AUTH_IDS
     
     for i, sequence in enumerate(auth_sequences):
-        print(f"\nAuthentication sequence {i+1}:")
-        print(f"  Duration: {sequence[-1]['timestamp'] - sequence[0]['timestamp']}s")
-        print(f"  Steps: {len(sequence)}")
+        out(f"\nAuthentication sequence {i+1}:")
+        out(f"  Duration: {timestamps[sequence[-1]] - timestamps[sequence[0]]}s")
+        out(f"  Steps: {len(sequence)}")
         
         for j, step in enumerate(sequence):
-            print(f"    Step {j+1}: {step['state']} ({step['device']})")
+            out(f"    Step {j+1}: {STATE_NAMES[stream.states[step]]} ({stream.devices[step]})")
         
         # Analyze timing between challenge and response
-        challenges = [s for s in sequence if s['state'] == 'AUTH_CHALLENGE']
-        responses = [s for s in sequence if s['state'] == 'AUTH_RESPONSE']
+        challenges = [s for s in sequence if stream.states[s] == challenge_id]
+        responses = [s for s in sequence if stream.states[s] == response_id]
         
         if challenges and responses:
             for challenge, response in zip(challenges, responses):
-                response_time = response['timestamp'] - challenge['timestamp']
-                print(f"    Challenge -> Response: {response_time}s")
+                response_time = timestamps[response] - timestamps[challenge]
+                out(f"    Challenge -> Response: {response_time}s")
+    
+    print("\n".join(lines))
 
-def analyze_power_cycle_impact(states, transitions):
+def analyze_power_cycle_impact(stream):
     """Analyze how power cycles affect the state machine"""
     print("\n=== POWER CYCLE IMPACT ANALYSIS ===")
     
-    # Find power cycles
-    power_cycles = []
-    current_cycle = []
+    lines = []
+    out = lines.append
     
-    for state in states:
-        if state['state'] == "POWER_RESET":
-            if current_cycle:
-                power_cycles.append(current_cycle)
-            current_cycle = [state]
-        else:
-            current_cycle.append(state)
+    # Find power cycles as ranges of message indices
+    power_cycles = [range(start, end) for start, end in pairwise(stream.cycle_bounds) if end > start]
     
-    if current_cycle:
-        power_cycles.append(current_cycle)
-    
-    print(f"Found {len(power_cycles)} power cycles")
+    out(f"Found {len(power_cycles)} power cycles")
     
     for i, cycle in enumerate(power_cycles):
-        print(f"\nPower cycle {i+1}:")
-        print(f"  Duration: {cycle[-1]['timestamp'] - cycle[0]['timestamp']}s")
-        print(f"  States: {len(cycle)}")
+        out(f"\nPower cycle {i+1}:")
+        out(f"  Duration: {stream.timestamps[cycle[-1]] - stream.timestamps[cycle[0]]}s")
+        out(f"  States: {len(cycle)}")
         
         # Analyze state progression
-        state_progression = [state['state'] for state in cycle]
-        print(f"  Progression: {' -> '.join(state_progression[:10])}{'...' if len(state_progression) > 10 else ''}")
+        state_progression = stream.states[cycle.start:cycle.stop]
+        out(f"  Progression: {' -> '.join(STATE_NAMES[state] for state in state_progression[:10])}{'...' if len(state_progression) > 10 else ''}")
         
         # Count unique states
         unique_states = set(state_progression)
-        print(f"  Unique states: {len(unique_states)}")
+        out(f"  Unique states: {len(unique_states)}")
         
         # Check for authentication
-        has_auth = any(state['state'] in ['AUTH_CHALLENGE', 'AUTH_RESPONSE'] for state in cycle)
-        print(f"  Has authentication: {has_auth}")
+        has_auth = any(state in AUTH_IDS for state in state_progression)
+        out(f"  Has authentication: {has_auth}")
+    
+    print("\n".join(lines))
 
 def main():
     filename = "rolling.txt"
     
     try:
-        states, transitions = extract_state_transitions(filename)
+        stream = extract_state_transitions(filename)
         
-        analyze_state_machine(states, transitions)
-        analyze_timing_patterns(states, transitions)
-        analyze_authentication_flow(states, transitions)
-        analyze_power_cycle_impact(states, transitions)
+        analyze_state_machine(stream)
+        analyze_timing_patterns(stream)
+        analyze_authentication_flow(stream)
+        analyze_power_cycle_impact(stream)
         
     except FileNotFoundError:
         print(f"Error: Could not find {filename}")
@@ -5,25 +5,60 @@ Simulates communication between WiFi module and smart home machine
 Based on Haier Smart Home Open Platform Protocol
 """
 
+import sys
 import time
 import threading
-from typing import List, Dict, Any
+from collections import deque
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import List, Dict, Any, Deque
 from dataclasses import dataclass
 from datetime import datetime
 
-@dataclass
+def _crc16_table(poly: int = 0xA001) -> tuple:
+    """Build the CRC16 lookup table, one entry per byte value"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ poly
+            else:
+                crc = crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+# Computed once at import; calculate_crc16 does one lookup per byte
+CRC16_TABLE = _crc16_table()
+
+@dataclass(slots=True, frozen=True)
 class CommunicationLog:
     timestamp: int
     source: str
     frame: str
     description: str
+    line: str  # "<source> <timestamp> - <frame>" as written by generate_log_file
 
 class WiFiModuleSimulator:
-    def __init__(self):
+    # Oldest communication log entries are dropped beyond this
+    MAX_LOG_ENTRIES = 100_000
+
+    # Commands accepted by run_interactive_simulation
+    INTERACTIVE_COMMANDS = ('power', 'temp', 'mode', 'status', 'alarm', 'network', 'quit')
+
+    # How each control command updates device_status
+    _COMMAND_SETTERS = {
+        'power': lambda status, value: status.update(power=value == 1),
+        'temperature': lambda status, value: status.update(temperature=value),
+        'mode': lambda status, value: status.update(mode=value),
+    }
+
+    def __init__(self, threadsafe: bool = False, delay_scale: float = 1.0, quiet: bool = False):
         self.frame_id = 0x01
         self.device_address = 0x40
         self.module_address = 0x00
-        self.communication_log: List[CommunicationLog] = []
+        # Ring buffer, so long runs hold bounded memory
+        self.communication_log: Deque[CommunicationLog] = deque(maxlen=self.MAX_LOG_ENTRIES)
         self.is_connected = False
         self.device_status = {
             'power': False,
@@ -31,15 +66,35 @@ class WiFiModuleSimulator:
             'mode': 'auto',
             'alarm': False
         }
-        self._lock = threading.Lock()
+        # Scales every simulated delay; 0 runs the simulation without sleeping
+        self._delay_scale = delay_scale
+
+        # Skips echoing each logged frame to stdout
+        self._quiet = quiet
+
+        # Only lock when the simulator is shared between threads
+        self._lock = threading.Lock() if threadsafe else nullcontext()
+
+        # Header and addresses are fixed per instance, so build_frame reuses these
+        self._header = bytes(self.generate_frame_header())
+        self._address_id = bytes(self.generate_address_identifier(self.module_address, self.device_address))
+
+        # Generated frame builders keyed by (frame_type, payload length, use_crc), and recently built frames
+        self._frame_builders: Dict[tuple, Any] = {}
+        self._cached_frame = lru_cache(maxsize=256)(self._assemble_frame)
+
+    def _delay(self, seconds: float):
+        """Sleep for a simulated delay, scaled by delay_scale"""
+        if self._delay_scale:
+            time.sleep(seconds * self._delay_scale)
 
     def generate_frame_header(self) -> List[int]:
         """Generate frame header (FF FF)"""
         return [0xFF, 0xFF]
 
-    def calculate_frame_length(self, data: List[int]) -> int:
-        """Calculate frame length (excluding header and CRC)"""
-        return len(data) + 1  # +1 for checksum
+    def calculate_frame_length(self, data_length: int) -> int:
+        """Calculate frame length (excluding header and CRC) from the length of the framed data"""
+        return data_length + 1  # +1 for checksum
 
     def generate_address_identifier(self, source: int, destination: int) -> List[int]:
         """Generate address identifier"""
@@ -47,56 +102,61 @@ class WiFiModuleSimulator:
 
     def calculate_checksum(self, frame_length: int, data: List[int]) -> int:
         """Calculate accumulative checksum"""
-        checksum = frame_length
-        for byte in data:
-            checksum += byte
-        return checksum & 0xFF  # Return low byte
+        return (frame_length + sum(data)) & 0xFF  # Return low byte
 
-    def calculate_crc16(self, data: List[int]) -> int:
+    def calculate_crc16(self, data: List[int], _table: tuple = CRC16_TABLE) -> int:
         """Calculate CRC16 checksum"""
         crc = 0xFFFF
         for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc = crc >> 1
+            crc = (crc >> 8) ^ _table[(crc ^ byte) & 0xFF]
         return crc
 
-    def escape_data(self, data: List[int]) -> List[int]:
+    def escape_data(self, data: bytes) -> bytes:
         """Handle 0xFF escape sequences"""
-        escaped = []
-        for byte in data:
-            escaped.append(byte)
-            if byte == 0xFF:
-                escaped.append(0x55)
-        return escaped
+        return bytes(data).replace(b'\xff', b'\xff\x55')
 
-    def build_frame(self, frame_type: int, data: List[int], use_crc: bool = False) -> List[int]:
+    def build_frame(self, frame_type: int, data: List[int], use_crc: bool = False) -> bytes:
         """Build complete frame"""
-        header = self.generate_frame_header()
-        address_id = self.generate_address_identifier(self.module_address, self.device_address)
-        frame_data = [frame_type] + data
-        frame_length = self.calculate_frame_length(address_id + frame_data)
-        
-        frame = header + [frame_length] + address_id + frame_data
+        # Scripted exchanges resend identical frames, so reuse recently built ones
+        return self._cached_frame(frame_type, bytes(data), use_crc)
+
+    def _assemble_frame(self, frame_type: int, data: bytes, use_crc: bool) -> bytes:
+        """Assemble, checksum and escape one frame"""
+        key = (frame_type, len(data), use_crc)
+        builder = self._frame_builders.get(key)
+        if builder is None:
+            builder = self._frame_builders[key] = self._compile_frame_builder(*key)
+        return builder(data)
+
+    def _compile_frame_builder(self, frame_type: int, data_length: int, use_crc: bool):
+        """Generate a frame builder specialized for one frame type and payload length
+
+        Everything before the payload is fixed for a given shape, so the prefix bytes and
+        their share of the checksum become constants in the generated code.
+        """
+        frame_length = self.calculate_frame_length(len(self._address_id) + 1 + data_length)  # +1 for frame type
+        prefix = self._header + bytes((frame_length,)) + self._address_id + bytes((frame_type,))
         
-        # Calculate checksum
-        checksum_data = frame[2:]  # Exclude header
-        checksum = self.calculate_checksum(frame_length, checksum_data)
-        frame.append(checksum)
+        # Checksum and CRC cover everything after the header
+        checksum_prefix = prefix[len(self._header):]
+        checksum_base = self.calculate_checksum(frame_length, checksum_prefix)
         
-        # Add CRC if needed
+        src = [
+            "def build_frame(data):",
+            f"    checksum = ({checksum_base} + sum(data)) & 0xFF",
+        ]
         if use_crc:
-            crc = self.calculate_crc16(checksum_data)
-            frame.append(crc & 0xFF)
-            frame.append((crc >> 8) & 0xFF)
+            src.append(f"    crc = calculate_crc16({checksum_prefix!r} + data)")
+            src.append(f"    frame = {prefix!r} + data + bytes((checksum, crc & 0xFF, crc >> 8))")
+        else:
+            src.append(f"    frame = {prefix!r} + data + bytes((checksum,))")
         
         # Handle 0xFF escape sequences
-        frame = self.escape_data(frame)
+        src.append("    return escape_data(frame)")
         
-        return frame
+        namespace = {"calculate_crc16": self.calculate_crc16, "escape_data": self.escape_data}
+        exec(compile("\n".join(src), f"<build_frame {frame_type:#04x}/{data_length}>", "exec"), namespace)
+        return namespace["build_frame"]
 
     def simulate_power_up(self):
         """Simulate power-up process"""
@@ -108,12 +168,12 @@ class WiFiModuleSimulator:
         self.log_communication("modem", power_up_frame, "Power-up initialization")
         
         # Step 2: Machine responds with acknowledgment
-        time.sleep(0.05)  # 50ms delay
+        self._delay(0.05)  # 50ms delay
         ack_frame = self.build_frame(0x61, [0x00])
         self.log_communication("machine", ack_frame, "Power-up acknowledgment")
         
         # Step 3: Module sends device information
-        time.sleep(0.1)  # 100ms delay
+        self._delay(0.1)  # 100ms delay
         device_info = self.build_frame(0x62, [
             0x45, 0x2B, 0x2B, 0x32, 0x2E, 0x31, 0x37, 0x00,  # Version info
             0x32, 0x30, 0x32, 0x34, 0x31, 0x32, 0x32, 0x34,  # Date
@@ -139,7 +199,7 @@ class WiFiModuleSimulator:
         self.log_communication("modem", control_frame, f"Control: {command}={value}")
         
         # Machine responds with acknowledgment
-        time.sleep(0.05)  # 50ms delay
+        self._delay(0.05)  # 50ms delay
         ack_frame = self.build_frame(0x4D, [0x61, 0x80])
         self.log_communication("machine", ack_frame, "Control acknowledgment")
         
@@ -166,7 +226,7 @@ class WiFiModuleSimulator:
         self.log_communication("machine", status_frame, "Status report")
         
         # Module responds with acknowledgment
-        time.sleep(0.05)  # 50ms delay
+        self._delay(0.05)  # 50ms delay
         ack_frame = self.build_frame(0x4D, [0x61, 0x80])
         self.log_communication("modem", ack_frame, "Status acknowledgment")
 
@@ -186,7 +246,7 @@ class WiFiModuleSimulator:
         self.log_communication("machine", alarm_frame, f"Alarm: {alarm_type}")
         
         # Module responds with acknowledgment (within 50ms as per spec)
-        time.sleep(0.03)  # 30ms delay
+        self._delay(0.03)  # 30ms delay
         ack_frame = self.build_frame(0x4D, [0x61, 0x80])
         self.log_communication("modem", ack_frame, "Alarm acknowledgment")
 
@@ -205,45 +265,43 @@ class WiFiModuleSimulator:
         self.log_communication("modem", query_frame, "Network status query")
         
         # Machine responds with network status
-        time.sleep(0.1)  # 100ms delay
+        self._delay(0.1)  # 100ms delay
         status_data = [0x00, 0x00, 0x3D, 0xD0, 0xE1]
         status_frame = self.build_frame(0xF5, status_data)
         self.log_communication("machine", status_frame, "Network status response")
 
     def update_device_status(self, command: str, value: int):
         """Update device status"""
-        with self._lock:
-            if command == 'power':
-                self.device_status['power'] = value == 1
-            elif command == 'temperature':
-                self.device_status['temperature'] = value
-            elif command == 'mode':
-                self.device_status['mode'] = value
+        setter = self._COMMAND_SETTERS.get(command)
+        if setter is not None:
+            with self._lock:
+                setter(self.device_status, value)
         
         print(f"📱 Device status updated: {self.device_status}")
 
-    def log_communication(self, source: str, frame: List[int], description: str):
+    def log_communication(self, source: str, frame: bytes, description: str):
         """Log communication"""
-        timestamp = int(time.time() * 1000)  # milliseconds
-        hex_string = ' '.join([f"{b:02x}" for b in frame])
+        timestamp = time.monotonic_ns() // 1_000_000  # monotonic milliseconds, arbitrary epoch
+        hex_string = bytes(frame).hex(' ')
+        
+        line = f"{source} {timestamp} - {hex_string}"
         
-        print(f"📡 {description}")
-        print(f"   {source} {timestamp} - {hex_string}")
+        # Echo both lines in one write
+        if not self._quiet:
+            sys.stdout.write(f"📡 {description}\n   {line}\n")
         
         with self._lock:
             self.communication_log.append(CommunicationLog(
                 timestamp=timestamp,
                 source=source,
                 frame=hex_string,
-                description=description
+                description=description,
+                line=line
             ))
 
     def generate_log_file(self) -> str:
         """Generate communication log file"""
-        log_lines = []
-        for entry in self.communication_log:
-            log_lines.append(f"{entry.source} {entry.timestamp} - {entry.frame}")
-        return '\n'.join(log_lines)
+        return '\n'.join([entry.line for entry in self.communication_log])
 
     def run_complete_simulation(self):
         """Run complete simulation sequence"""
@@ -254,39 +312,54 @@ class WiFiModuleSimulator:
         self.simulate_power_up()
         
         # Wait for power-up to complete, then run other processes
-        time.sleep(2)
+        self._delay(2)
         
         # Control commands
         self.simulate_control_command('power', 1)
-        time.sleep(1)
+        self._delay(1)
         
         self.simulate_control_command('temperature', 22)
-        time.sleep(1)
+        self._delay(1)
         
         self.simulate_control_command('mode', 2)
-        time.sleep(1)
+        self._delay(1)
         
         # Status reporting
         self.simulate_status_reporting()
-        time.sleep(1)
+        self._delay(1)
         
         # Network status query
         self.simulate_network_status_query()
-        time.sleep(1)
+        self._delay(1)
         
         # Simulate alarm
         self.simulate_alarm('temperature_high')
-        time.sleep(1)
+        self._delay(1)
         
         print("\n✅ Simulation completed!")
         print(f"📊 Total communications: {len(self.communication_log)}")
         print("📄 Log file generated:")
         print(self.generate_log_file())
 
+    def _enable_command_completion(self):
+        """Enable input history and tab completion of commands where readline is available"""
+        try:
+            import readline
+        except ImportError:
+            return
+        
+        def complete(text, state):
+            matches = [command for command in self.INTERACTIVE_COMMANDS if command.startswith(text)]
+            return matches[state] if state < len(matches) else None
+        
+        readline.set_completer(complete)
+        readline.parse_and_bind('tab: complete')
+
     def run_interactive_simulation(self):
         """Run interactive simulation with user input"""
         print("🎮 Interactive WiFi Module Simulator")
-        print("Commands: power, temp, mode, status, alarm, network, quit")
+        print(f"Commands: {', '.join(self.INTERACTIVE_COMMANDS)}")
+        self._enable_command_completion()
         
         while True:
             try:
@@ -311,7 +384,7 @@ class WiFiModuleSimulator:
                 elif command == 'network':
                     self.simulate_network_status_query()
                 else:
-                    print("Unknown command. Available: power, temp, mode, status, alarm, network, quit")
+                    print(f"Unknown command. Available: {', '.join(self.INTERACTIVE_COMMANDS)}")
                     
             except KeyboardInterrupt:
                 print("\n👋 Goodbye!")